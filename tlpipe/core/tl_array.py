@@ -14,7 +14,6 @@ import aipy as ap
 import constants as const
 from tlpipe.map.drift.telescope import cylbeam
 from tlpipe.map.drift.core import visibility
-from cora.util import coord
 from cora.util import hputil
 
 
@@ -76,7 +75,6 @@ def top2eq_m(lat, lon):
     return m
 
 
-
 class DishBeam(ap.fit.Beam2DGaussian):
     """Circular beam of a dish antenna."""
 
@@ -92,11 +90,56 @@ class DishBeam(ap.fit.Beam2DGaussian):
 
         """
 
-        freqs = 1.0e-3 * np.array([freqs])  # in GHz
+        freqs = 1.0e-3 * np.atleast_2d(np.asarray(freqs, dtype=np.float64))  # in GHz
         lmbda = const.c / (1.0e9 * freqs) # in m
         xwidth = 1.22 * lmbda / diameter
         ywidth = xwidth
         ap.fit.Beam2DGaussian.__init__(self, freqs, xwidth, ywidth)
+        self.update()
+
+    def update(self):
+        """Update the cached Gaussian exponents of the active channels.
+
+        This is called by aipy whenever the widths or the active channels change.
+
+        """
+        ap.fit.Beam2DGaussian.update(self)
+
+        xwidth = np.broadcast_to(self.xwidth, self.freqs.shape).ravel().take(self.chans)
+        ywidth = np.broadcast_to(self.ywidth, self.freqs.shape).ravel().take(self.chans)
+        if np.array_equal(xwidth, ywidth):
+            # amplitude sqrt(exp(-0.5 * theta**2 / width**2)) = exp(-alpha * theta**2)
+            self._alpha = 0.25 / xwidth**2
+        else:
+            self._alpha = None
+
+    def response(self, xyz):
+        """Beam response across active band for specified topocentric coordinates.
+
+        For a circular beam the Gaussian is evaluated directly from the radial
+        angle with the cached exponents, otherwise this falls back to
+        :meth:`aipy.fit.Beam2DGaussian.response`.
+
+        Parameters
+        ----------
+        xyz : array like, of shape (3, ...)
+            Unit direction vector in topocentric coordinates (x=E, y=N, z=UP).
+            `xyz` may be arrays of multiple coordinates.
+
+
+        Returns
+        -------
+        Returns 'x' linear polarization (rotate pi/2 for 'y') of shape (nfreq, ...).
+
+        """
+
+        if self._alpha is None:
+            return ap.fit.Beam2DGaussian.response(self, xyz)
+
+        x, y, z = xyz
+        theta2 = np.arcsin(x)**2 + np.arcsin(y)**2
+
+        return np.exp(-np.multiply.outer(self._alpha, theta2))
 
 
 class CylinderBeam(ap.fit.Beam):
@@ -120,59 +163,76 @@ class CylinderBeam(ap.fit.Beam):
 
         """
 
-        freqs = 1.0e-3 * np.array(freqs)  # in GHz
+        freqs = 1.0e-3 * np.asarray(freqs, dtype=np.float64)  # in GHz
         ap.fit.Beam.__init__(self, freqs)
         self.width = width
         self.length = length
+        self._inv_lmbda = (1.0e9 * self.freqs) / const.c # in 1/m
+        self._beampats = (None, None) # (fwhm, width) the patterns were built for, patterns
 
-    # def response(self, xyz):
-    #     """Beam response across active band for specified topocentric coordinates.
+    @property
+    def fwhm_e(self):
+        e_width = 0.7
+        return self._fwhm_e * e_width
 
-    #     This is just a simple beam model as the product of 2 sinc function.
+    @property
+    def fwhm_h(self):
+        h_width = 1.0
+        return self._fwhm_h * h_width
 
-    #     Parameters
-    #     ----------
-    #     xyz : array like, of shape (3, ...)
-    #         Unit direction vector in topocentric coordinates (x=E, y=N, z=UP).
-    #         `xyz` may be arrays of multiple coordinates.
+    def _ew_beampats(self):
+        """Return the E-W Fraunhofer patterns of the cylinder at each frequency.
 
+        Building a pattern needs an FFT and a spline fit, which is much more
+        expensive than evaluating it, so the patterns are built on first use
+        and kept until the feed width or the cylinder width changes.
 
-    #     Returns
-    #     -------
-    #     Returns 'x' linear polarization (rotate pi/2 for 'y') of shape (nfreq, ...).
+        """
+        key = (self.fwhm_h, self.width)
+        if self._beampats[0] != key:
+            fwhm = self.fwhm_h
+            xplane = lambda t: cylbeam.beam_exptan(t, fwhm)
+            beampats = [ cylbeam.fraunhofer_cylinder(xplane, width) for width in self.width * self._inv_lmbda ]
+            self._beampats = (key, beampats)
 
-    #     """
+        return self._beampats[1]
 
-    #     vec_n = np.array(xyz).T
-    #     vec_z = np.array([0.0, 0.0, 1.0]) # unit vector pointing to the zenith
-    #     nz = np.dot(vec_n, vec_z)
+    def dir_factors(self, xyz):
+        """Return the direction dependent factors of the response at `xyz`.
 
-    #     vec_u = np.array([1.0, 0.0, 0.0]) # unit vector pointing East in the ground-plane
-    #     vec_v = np.array([0.0, 1.0, 0.0]) # unit vector pointing North in the ground-plane
-    #     nu = np.dot(vec_n, vec_u)
-    #     nv = np.dot(vec_n, vec_v)
+        The factors can be passed as `dir_factors` to :meth:`response` or
+        :meth:`response_batch` to share this work between beams evaluated at
+        the same directions, e.g. all the feeds of a cylinder array.
 
-    #     shp = tuple([-1] + [1] * len(nz.shape))
-    #     lmbda = const.c / (1.0e9 * self.freqs).reshape(shp) # in m
+        Parameters
+        ----------
+        xyz : array like, of shape (3, ...)
+            Unit direction vector in topocentric coordinates (x=E, y=N, z=UP).
+            `xyz` may be arrays of multiple coordinates.
 
-    #     nz = np.where(nz<=0.0, 0.0, nz) # mask respose under horizon
+        Returns
+        -------
+        nu : np.ndarray, of shape (...)
+            Projections of `xyz` onto the E-W axis of the cylinder.
+        ns_amp : np.ndarray, of shape (...)
+            The N-S amplitudes, zero below the horizon, in single precision.
 
-    #     factor = 1.0e-60
+        """
 
-    #     # print (np.sinc(self.width * nu / lmbda) * np.sinc(factor * nv / lmbda)).shape
-    #     # print nz.shape
+        # C order makes each component below a unit-stride row, and no copy is
+        # made if `xyz` already is a contiguous float64 array
+        xyz = np.ascontiguousarray(xyz, dtype=np.float64)
 
-    #     return np.sinc(self.width * nu / lmbda) * np.sinc(factor * nv / lmbda) * nz
+        # the cylinder axes coincide with the topocentric axes (x=E, y=N, z=UP),
+        # so the projections used in cylbeam.beam_amp are just the components
+        nu, nv, nz = xyz[0], xyz[1], xyz[2]
 
-    @property
-    def fwhm_e(self):
-        e_width = 0.7
-        return self._fwhm_e * e_width
+        # the N-S amplitude and the horizon mask do not depend on frequency,
+        # so combine them once and only evaluate the E-W pattern per frequency
+        ns_amp = np.asarray(cylbeam.beam_exptan_sin(nv.astype(np.float32), self.fwhm_h))
+        ns_amp *= (nz > 0.0) # mask response under horizon
 
-    @property
-    def fwhm_h(self):
-        h_width = 1.0
-        return self._fwhm_h * h_width
+        return nu, ns_amp
 
     @property
     def Omega(self):
@@ -183,17 +243,20 @@ class CylinderBeam(ap.fit.Beam):
         lon = np.radians(91.80686667) # exact value not important
         zenith = np.array([0.5*np.pi - lat, lon])
         horizon = visibility.horizon(angpos, zenith)
+        # pixels below the horizon do not contribute, so drop them once
+        angpos = angpos[horizon]
 
         pxarea = (4 * np.pi / (12 * nside**2))
         om = np.zeros_like(self.freqs)
         for fi in xrange(len(self.freqs)):
-            width = self.width / (const.c / (1.0e9 * self.freqs[fi]))
+            width = self.width * self._inv_lmbda[fi]
             beam = cylbeam.beam_amp(angpos, zenith, width, self.fwhm_h, self.fwhm_h)
-            om[fi] = np.sum(np.abs(beam)**2 * horizon) * pxarea
+            # the beam amplitude is real, so |A|^2 summed is just A . A
+            om[fi] = np.dot(beam, beam) * pxarea
 
         return om
 
-    def response(self, xyz):
+    def response(self, xyz, out=None, dir_factors=None):
         """Beam response across active band for specified topocentric coordinates.
 
         This uses the beam model implemented in driftscan package.
@@ -203,36 +266,82 @@ class CylinderBeam(ap.fit.Beam):
         xyz : array like, of shape (3, ...)
             Unit direction vector in topocentric coordinates (x=E, y=N, z=UP).
             `xyz` may be arrays of multiple coordinates.
+        out : np.ndarray, of shape (nfreq, ...), optional
+            If given, the response is written into it and it is returned.
+            Default None to allocate a new array.
+        dir_factors : tuple, optional
+            The factors returned by :meth:`dir_factors` for `xyz`, which are
+            computed if not given. Default None.
 
 
         Returns
         -------
-        Returns 'x' linear polarization (rotate pi/2 for 'y') of shape (nfreq, ...).
+        Returns 'x' linear polarization (rotate pi/2 for 'y') of shape (nfreq, ...),
+        in single precision unless `out` is given.
 
         """
 
-        xyz = np.array(xyz)
+        if out is None:
+            return self.response_batch([self], xyz, dir_factors=dir_factors)[0]
 
-        lat = np.radians(44.15268333) # exact value not important
-        lon = np.radians(91.80686667) # exact value not important
-        zenith = np.array([0.5*np.pi - lat, lon])
+        shape = (len(self._inv_lmbda),) + np.shape(xyz)[1:]
+        if out.shape != shape:
+            raise ValueError('Invalid shape of out: %s, should be %s' % (out.shape, shape))
+
+        self.response_batch([self], xyz, out=out[np.newaxis], dir_factors=dir_factors)
+
+        return out
+
+    @staticmethod
+    def response_batch(beams, xyz, out=None, dir_factors=None):
+        """Beam responses of several cylinders for the same topocentric coordinates.
+
+        The direction dependent work is done only once and shared by all
+        cylinders and frequencies.
+
+        Parameters
+        ----------
+        beams : list of :class:`CylinderBeam`
+            The cylinder beams, which must have the same number of frequencies.
+        xyz : array like, of shape (3, ...)
+            Unit direction vector in topocentric coordinates (x=E, y=N, z=UP).
+            `xyz` may be arrays of multiple coordinates.
+        out : np.ndarray, of shape (nbeam, nfreq, ...), optional
+            If given, the responses are written into it and it is returned.
+            Default None to allocate a new array.
+        dir_factors : tuple, optional
+            The factors returned by :meth:`dir_factors` for `xyz`, which are
+            computed if not given. Default None.
+
+        Returns
+        -------
+        Returns 'x' linear polarization (rotate pi/2 for 'y') of shape (nbeam, nfreq, ...),
+        in single precision unless `out` is given.
+
+        """
+
+        if dir_factors is None:
+            dir_factors = beams[0].dir_factors(xyz)
+        nu, ns_amp = dir_factors
 
-        m = top2eq_m(lat, lon) # conversion matrix
-        shp = xyz.shape
-        p_eq = np.dot(m, xyz.reshape(3, -1)).reshape(shp) # point_direction in equatorial coord
-        p_eq = coord.cart_to_sph(p_eq.T) # to theta, phi
+        beampats = [ beam._ew_beampats() for beam in beams ]
+        nfreq = len(beampats[0])
+        if any(len(bp) != nfreq for bp in beampats):
+            raise ValueError('All beams must have the same number of frequencies')
 
-        # cylinder width in wavelength
-        width = self.width / (const.c / (1.0e9 * self.freqs))
+        shape = (len(beams), nfreq) + nu.shape
+        if out is None:
+            # single precision is ample for a beam model and halves the memory traffic
+            out = np.empty(shape, dtype=np.float32)
+        elif out.shape != shape:
+            raise ValueError('Invalid shape of out: %s, should be %s' % (out.shape, shape))
 
-        nfreq = len(self.freqs)
-        resp = np.zeros((nfreq,)+xyz.shape[1:])
-        for fi in xrange( nfreq):
-            resp[fi] = cylbeam.beam_amp(p_eq, zenith, width[fi], self.fwhm_h, self.fwhm_h)
-            # resp[fi] = cylbeam.beam_amp(p_eq, zenith, width[fi], self.fwhm_e, self.fwhm_h) # for X dipole
-            # resp[fi] = cylbeam.beam_amp(p_eq, zenith, width[fi], self.fwhm_h, self.fwhm_e) # for Y dipole
+        nu_flat = nu.ravel()
+        for bi, bps in enumerate(beampats):
+            for fi, beampat in enumerate(bps):
+                np.multiply(beampat(nu_flat).reshape(nu.shape), ns_amp, out=out[bi, fi, ...])
 
-        return resp
+        return out
 
 
 
@@ -277,22 +386,24 @@ if __name__ == '__main__':
     import matplotlib.pyplot as plt
 
     xs = np.linspace(-1.0, 1.0, 2000)
-    xz = np.array([ np.array([x, 0.0, (1.0-x**2)**0.5]) for x in xs ])
+    xz = np.stack((xs, np.zeros_like(xs), np.sqrt(1.0 - xs**2)), axis=1)
     x_ang = np.degrees(np.arctan2(xz[:, 2], xz[:, 0]))
 
     ys = np.linspace(-1.0, 1.0, 2000)
-    yz = np.array([ np.array([0.0, y, (1.0-y**2)**0.5]) for y in ys ])
+    yz = np.stack((np.zeros_like(ys), ys, np.sqrt(1.0 - ys**2)), axis=1)
     y_ang = np.degrees(np.arctan2(yz[:, 2], yz[:, 1]))
 
     cyl_beam = CylinderBeam([750.0, 760.0], 15.0, 40.0)
     print 'om:', cyl_beam.Omega
-    x_resp = cyl_beam.response(xz.T)
-    y_resp = cyl_beam.response(yz.T)
+    # evaluate both cuts in one call so the direction and pattern setup is shared
+    resp = cyl_beam.response(np.concatenate((xz, yz)).T)
+    x_resp, y_resp = resp[:, :len(xs)], resp[:, len(xs):]
 
-    x_inds = np.where(x_resp>=0.5)[1]
-    x_ind1, x_ind2 = x_inds[0], x_inds[-1]
-    y_inds = np.where(y_resp>=0.5)[1]
-    y_ind1, y_ind2 = y_inds[0], y_inds[-1]
+    # first and last points above half maximum of the (unimodal) beam at the first frequency
+    x_above = x_resp[0] >= 0.5
+    x_ind1, x_ind2 = np.argmax(x_above), len(x_above) - 1 - np.argmax(x_above[::-1])
+    y_above = y_resp[0] >= 0.5
+    y_ind1, y_ind2 = np.argmax(y_above), len(y_above) - 1 - np.argmax(y_above[::-1])
 
     print x_resp.shape
     print y_resp.shape
@@ -323,7 +434,7 @@ if __name__ == '__main__':
 
     # 2d plot
     plt.figure()
-    plt.imshow(resp[0].T, origin='lower')
+    plt.imshow(resp[0], origin='lower')
     plt.colorbar()
     plt.savefig('cy2.png')
     plt.clf()
@@ -103,6 +103,42 @@ def beam_exptan(theta, fwhm):
     return np.exp(-alpha*np.tan(theta)**2)
 
 
+def beam_exptan_sin(sintheta, fwhm):
+    """ExpTan beam as a function of the sine of the angle.
+
+    Equivalent to ``beam_exptan(np.arcsin(sintheta), fwhm)``, but uses
+    :math:`\tan^2\theta = \sin^2\theta / (1 - \sin^2\theta)` to avoid
+    evaluating `arcsin` and `tan`. Values with :math:`|\sin\theta| > 1`, e.g.
+    from rounding errors of unit vectors, are treated as :math:`\pm 1`.
+
+    Parameters
+    ----------
+    sintheta : array_like
+        Sine of the angles to return beam at.
+    fwhm : scalar
+        Beam width at half power (note that the beam returned is amplitude).
+
+    Returns
+    -------
+    beam : array_like
+        The amplitude beam at each requested angle, a scalar if `sintheta`
+        is a scalar.
+    """
+    alpha = np.log(2.0) / (2*np.tan(fwhm / 2.0)**2)
+
+    # evaluate in place in a single buffer of the input precision
+    sintheta = np.asarray(sintheta)
+    s2 = np.empty(sintheta.shape, dtype=np.result_type(sintheta.dtype, np.float32))
+    np.square(sintheta, out=s2)
+    np.minimum(s2, 1.0, out=s2)
+    with np.errstate(divide='ignore'):
+        np.divide(s2, 1.0 - s2, out=s2)
+    s2 *= -alpha
+    np.exp(s2, out=s2)
+
+    return s2[()]
+
+
 
 def fraunhofer_cylinder(antenna_func, width, res=1.0):
     """Calculate the Fraunhofer diffraction pattern for a feed illuminating a
@@ -181,10 +217,13 @@ def beam_amp(angpos, zenith, width, fwhm_x, fwhm_y, rot=[0.0, 0.0, 0.0]):
     beampat = fraunhofer_cylinder(xplane, width)
 
     cvec = coord.sph_to_cart(angpos)
-    horizon = (np.dot(cvec, coord.sph_to_cart(zenith)) > 0.0).astype(np.float64)
+    # project onto the cylinder axes and the zenith with a single matrix product
+    basis = np.array([xhat, yhat, coord.sph_to_cart(zenith)])
+    proj = np.tensordot(basis, cvec, axes=(1, -1))
+    horizon = (proj[2] > 0.0).astype(np.float64)
 
-    ew_amp = beampat(np.dot(cvec, xhat))
-    ns_amp = yplane(np.arcsin(np.dot(cvec, yhat)))
+    ew_amp = beampat(proj[0])
+    ns_amp = yplane(np.arcsin(proj[1]))
 
     return (ew_amp * ns_amp * horizon)
 
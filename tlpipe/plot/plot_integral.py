@@ -8,17 +8,41 @@ Inheritance diagram
 
 """
 
-from datetime import datetime, timedelta
 import numpy as np
 from tlpipe.timestream import timestream_task
 from tlpipe.container.raw_timestream import RawTimestream
 from tlpipe.container.timestream import Timestream
 from tlpipe.utils.path_util import output_path
+from tlpipe.utils.np_util import masked_if_any
+from tlpipe.utils import date_util
+from tlpipe.utils.bl_util import bl_selector
+from tlpipe.utils.fig_writer import FigWriter
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from matplotlib.ticker import MaxNLocator, AutoMinorLocator
 
 
+_cnan = complex(np.nan, np.nan) # complex nan
+
+
+def _valid_mean(vis, axis):
+    """Mean of `vis` along `axis` over its unmasked finite values.
+
+    Same as ``np.ma.mean(np.ma.masked_invalid(vis), axis=axis)``, but sums the
+    zero-filled values and divides by the valid counts directly instead of
+    building the intermediate masked arrays.
+
+    """
+    data = np.ma.getdata(vis)
+    valid = np.isfinite(data)
+    if isinstance(vis, np.ma.MaskedArray):
+        valid &= ~np.ma.getmaskarray(vis)
+    total = np.where(valid, data, 0).sum(axis=axis)
+    count = valid.sum(axis=axis)
+
+    return np.ma.array(total / np.maximum(count, 1), mask=(count == 0))
+
+
 class Plot(timestream_task.TimestreamTask):
     """Plot time or frequency integral.
 
@@ -56,7 +80,21 @@ class Plot(timestream_task.TimestreamTask):
         show_progress = self.params['show_progress']
         progress_step = self.params['progress_step']
 
-        func(self.plot, full_data=True, show_progress=show_progress, progress_step=progress_step, keep_dist_axis=False)
+        self._bl_selected = bl_selector(self.params['bl_incl'], self.params['bl_excl'])
+
+        # the x-axis is the same for all baselines, so compute it only once here
+        integral = self.params['integral']
+        if integral == 'time':
+            self._ax_val = ts.freq[:]
+            self._xlabel = r'$\nu$ / MHz'
+        elif integral == 'freq':
+            # self._ax_val = ts.time[:]
+            # self._xlabel = r'$t$ / Julian Date'
+            self._ax_val = date_util.get_datenum(ts['sec1970'][:])
+            self._xlabel = '%s' % mdates.num2date(self._ax_val[0]).date()
+
+        with FigWriter() as self._fig_writer:
+            func(self.plot, full_data=True, show_progress=show_progress, progress_step=progress_step, keep_dist_axis=False)
 
         return super(Plot, self).process(ts)
 
@@ -64,8 +102,6 @@ class Plot(timestream_task.TimestreamTask):
         """Function that does the actual plot work."""
 
         integral = self.params['integral']
-        bl_incl = self.params['bl_incl']
-        bl_excl = self.params['bl_excl']
         flag_mask = self.params['flag_mask']
         flag_ns = self.params['flag_ns']
         fig_prefix = self.params['fig_name']
@@ -91,40 +127,31 @@ class Plot(timestream_task.TimestreamTask):
         else:
             raise ValueError('Need either a RawTimestream or Timestream')
 
-        if bl_incl != 'all':
-            bl1 = set(bl)
-            bl_incl = [ {f1, f2} for (f1, f2) in bl_incl ]
-            bl_excl = [ {f1, f2} for (f1, f2) in bl_excl ]
-            if (not bl1 in bl_incl) or (bl1 in bl_excl):
-                return
+        if not self._bl_selected(bl):
+            return
 
         if flag_mask:
-            vis1 = np.ma.array(vis, mask=vis_mask)
+            vis1 = masked_if_any(vis, vis_mask)
         elif flag_ns:
             if 'ns_on' in ts.iterkeys():
                 vis1 = vis.copy()
-                on = np.where(ts['ns_on'][:])[0]
-                vis1[on] = complex(np.nan, np.nan)
+                on = np.flatnonzero(ts['ns_on'][:])
+                vis1[on] = _cnan
             else:
                 vis1 = vis
         else:
             vis1 = vis
 
         if integral == 'time':
-            vis1 = np.ma.mean(np.ma.masked_invalid(vis1), axis=0)
-            ax_val = ts.freq[:]
-            xlabel = r'$\nu$ / MHz'
+            vis1 = _valid_mean(vis1, axis=0)
         elif integral == 'freq':
-            vis1 = np.ma.mean(np.ma.masked_invalid(vis1), axis=1)
-            # ax_val = ts.time[:]
-            # xlabel = r'$t$ / Julian Date'
-            ax_val = np.array([ (datetime.utcfromtimestamp(sec) + timedelta(hours=8)) for sec in ts['sec1970'][:] ])
-            xlabel = '%s' % ax_val[0].date()
-            ax_val = mdates.date2num(ax_val)
+            vis1 = _valid_mean(vis1, axis=1)
         else:
             raise ValueError('Unknown integral type %s' % integral)
 
-        plt.figure()
+        ax_val = self._ax_val
+        xlabel = self._xlabel
+
         f, axarr = plt.subplots(3, sharex=True)
         axarr[0].plot(ax_val, vis1.real, label='real')
         axarr[0].legend()
@@ -164,5 +191,5 @@ class Plot(timestream_task.TimestreamTask):
             fig_name = output_path(fig_name, iteration=iteration)
         else:
             fig_name = output_path(fig_name)
-        plt.savefig(fig_name)
-        plt.close()
+        self._fig_writer.savefig(f, fig_name)
+        plt.close(f)
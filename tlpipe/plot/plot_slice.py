@@ -8,17 +8,23 @@ Inheritance diagram
 
 """
 
-from datetime import datetime, timedelta
 import numpy as np
 from tlpipe.timestream import timestream_task
 from tlpipe.container.raw_timestream import RawTimestream
 from tlpipe.container.timestream import Timestream
 from tlpipe.utils.path_util import output_path
+from tlpipe.utils.np_util import masked_if_any
+from tlpipe.utils import date_util
+from tlpipe.utils.bl_util import bl_selector
+from tlpipe.utils.fig_writer import FigWriter
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from matplotlib.ticker import MaxNLocator, AutoMinorLocator
 
 
+_cnan = complex(np.nan, np.nan) # complex nan
+
+
 class Plot(timestream_task.TimestreamTask):
     """Plot time or frequency slices.
 
@@ -56,7 +62,21 @@ class Plot(timestream_task.TimestreamTask):
         show_progress = self.params['show_progress']
         progress_step = self.params['progress_step']
 
-        func(self.plot, full_data=True, show_progress=show_progress, progress_step=progress_step, keep_dist_axis=False)
+        self._bl_selected = bl_selector(self.params['bl_incl'], self.params['bl_excl'])
+
+        # the x-axis is the same for all baselines, so compute it only once here
+        plot_type = self.params['plot_type']
+        if plot_type == 'time':
+            self._ax_val = ts.freq[:]
+            self._xlabel = r'$\nu$ / MHz'
+        elif plot_type == 'freq':
+            # self._ax_val = ts.time[:]
+            # self._xlabel = r'$t$ / Julian Date'
+            self._ax_val = date_util.get_datenum(ts['sec1970'][:])
+            self._xlabel = '%s' % mdates.num2date(self._ax_val[0]).date()
+
+        with FigWriter() as self._fig_writer:
+            func(self.plot, full_data=True, show_progress=show_progress, progress_step=progress_step, keep_dist_axis=False)
 
         return super(Plot, self).process(ts)
 
@@ -64,8 +84,6 @@ class Plot(timestream_task.TimestreamTask):
         """Function that does the actual plot work."""
 
         plot_type = self.params['plot_type']
-        bl_incl = self.params['bl_incl']
-        bl_excl = self.params['bl_excl']
         flag_mask = self.params['flag_mask']
         flag_ns = self.params['flag_ns']
         slices = self.params['slices']
@@ -92,12 +110,8 @@ class Plot(timestream_task.TimestreamTask):
         else:
             raise ValueError('Need either a RawTimestream or Timestream')
 
-        if bl_incl != 'all':
-            bl1 = set(bl)
-            bl_incl = [ {f1, f2} for (f1, f2) in bl_incl ]
-            bl_excl = [ {f1, f2} for (f1, f2) in bl_excl ]
-            if (not bl1 in bl_incl) or (bl1 in bl_excl):
-                return
+        if not self._bl_selected(bl):
+            return
 
         if plot_type == 'time':
             nt = vis.shape[0]
@@ -105,69 +119,56 @@ class Plot(timestream_task.TimestreamTask):
             s = max(0, c-slices/2)
             e = min(nt, s+slices)
             if flag_mask:
-                vis1 = np.ma.array(vis[s:e], mask=vis_mask[s:e])
+                vis1 = masked_if_any(vis[s:e], vis_mask[s:e])
             elif flag_ns:
                 vis1 = vis[s:e].copy()
                 if 'ns_on' in ts.iterkeys():
                     ns_on = ts['ns_on'][s:e]
-                    on = np.where(ns_on)[0]
-                    vis1[on] = complex(np.nan, np.nan)
+                    on = np.flatnonzero(ns_on)
+                    vis1[on] = _cnan
             else:
                 vis1 = vis[s:e]
 
             o = c - s
-            shift = 0.1 * np.ma.max(np.abs(vis1[o]))
-
-            ax_val = ts.freq[:]
-            xlabel = r'$\nu$ / MHz'
         elif plot_type == 'freq':
             nfreq = vis.shape[1]
             c = nfreq/2
             s = max(0, c-slices/2)
             e = min(nfreq, s+slices)
             if flag_mask:
-                vis1 = np.ma.array(vis[:, s:e], mask=vis_mask[:, s:e])
+                vis1 = masked_if_any(vis[:, s:e], vis_mask[:, s:e])
             elif flag_ns:
                 vis1 = vis[:, s:e].copy()
                 if 'ns_on' in ts.iterkeys():
                     ns_on = ts['ns_on'][:]
-                    on = np.where(ns_on)[0]
-                    vis1[on] = complex(np.nan, np.nan)
+                    on = np.flatnonzero(ns_on)
+                    vis1[on] = _cnan
             else:
                 vis1 = vis[:, s:e]
 
             o = c - s
-            shift = 0.1 * np.ma.max(np.abs(vis1[:, o]))
-
-            # ax_val = ts.time[:]
-            # xlabel = r'$t$ / Julian Date'
-            ax_val = np.array([ (datetime.utcfromtimestamp(sec) + timedelta(hours=8)) for sec in ts['sec1970'][:] ])
-            xlabel = '%s' % ax_val[0].date()
-            ax_val = mdates.date2num(ax_val)
+            vis1 = vis1.T # make the slices along the first axis
         else:
             raise ValueError('Unknown plot_type %s, must be either time or freq' % plot_type)
 
-        plt.figure()
+        ax_val = self._ax_val
+        xlabel = self._xlabel
+
+        # compute the real, imag and abs of all slices once
+        vis_real, vis_imag, vis_abs = vis1.real, vis1.imag, np.abs(vis1)
+        shift = 0.1 * np.ma.max(vis_abs[o])
+
         f, axarr = plt.subplots(3, sharex=True)
         for i in range(e - s):
-            if plot_type == 'time':
-                axarr[0].plot(ax_val, vis1[i].real + (i - o)*shift, label='real')
-            elif plot_type == 'freq':
-                axarr[0].plot(ax_val, vis1[:, i].real + (i - o)*shift, label='real')
+            axarr[0].plot(ax_val, vis_real[i] + (i - o)*shift, label='real')
             if i == 0:
                 axarr[0].legend()
 
-            if plot_type == 'time':
-                axarr[1].plot(ax_val, vis1[i].imag + (i - o)*shift, label='imag')
-            elif plot_type == 'freq':
-                axarr[1].plot(ax_val, vis1[:, i].imag + (i - o)*shift, label='imag')
+            axarr[1].plot(ax_val, vis_imag[i] + (i - o)*shift, label='imag')
             if i == 0:
                 axarr[1].legend()
 
-            if plot_type == 'time':
-                axarr[2].plot(ax_val, np.abs(vis1[i]) + (i - o)*shift, label='abs')
-            elif plot_type == 'freq':
-                axarr[2].plot(ax_val, np.abs(vis1[:, i]) + (i - o)*shift, label='abs')
+            axarr[2].plot(ax_val, vis_abs[i] + (i - o)*shift, label='abs')
             if i == 0:
                 axarr[2].legend()
 
@@ -205,5 +206,5 @@ class Plot(timestream_task.TimestreamTask):
             fig_name = output_path(fig_name, iteration=iteration)
         else:
             fig_name = output_path(fig_name)
-        plt.savefig(fig_name)
-        plt.close()
+        self._fig_writer.savefig(f, fig_name)
+        plt.close(f)
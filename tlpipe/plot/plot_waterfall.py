@@ -9,13 +9,15 @@ Inheritance diagram
 """
 
 # import pytz
-from datetime import datetime, timedelta
 import numpy as np
-from scipy.interpolate import InterpolatedUnivariateSpline
 from tlpipe.timestream import timestream_task
 from tlpipe.container.raw_timestream import RawTimestream
 from tlpipe.container.timestream import Timestream
 from tlpipe.utils.path_util import output_path
+from tlpipe.utils import date_util
+from tlpipe.utils.np_util import masked_if_any, spline_fill
+from tlpipe.utils.bl_util import bl_selector
+from tlpipe.utils.fig_writer import FigWriter
 from tlpipe.utils import hist_eq
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
@@ -68,15 +70,16 @@ class Plot(timestream_task.TimestreamTask):
         show_progress = self.params['show_progress']
         progress_step = self.params['progress_step']
 
-        func(self.plot, full_data=True, show_progress=show_progress, progress_step=progress_step, keep_dist_axis=False)
+        self._bl_selected = bl_selector(self.params['bl_incl'], self.params['bl_excl'])
+
+        with FigWriter() as self._fig_writer:
+            func(self.plot, full_data=True, show_progress=show_progress, progress_step=progress_step, keep_dist_axis=False)
 
         return super(Plot, self).process(ts)
 
     def plot(self, vis, vis_mask, li, gi, bl, ts, **kwargs):
         """Function that does the actual plot work."""
 
-        bl_incl = self.params['bl_incl']
-        bl_excl = self.params['bl_excl']
         flag_mask = self.params['flag_mask']
         flag_ns = self.params['flag_ns']
         interpolate_ns = self.params['interpolate_ns']
@@ -111,27 +114,24 @@ class Plot(timestream_task.TimestreamTask):
         else:
             raise ValueError('Need either a RawTimestream or Timestream')
 
-        if bl_incl != 'all':
-            bl1 = set(bl)
-            bl_incl = [ {f1, f2} for (f1, f2) in bl_incl ]
-            bl_excl = [ {f1, f2} for (f1, f2) in bl_excl ]
-            if (not bl1 in bl_incl) or (bl1 in bl_excl):
-                return
+        if not self._bl_selected(bl):
+            return
 
         if flag_mask:
-            vis1 = np.ma.array(vis, mask=vis_mask)
+            vis1 = masked_if_any(vis, vis_mask)
         elif flag_ns:
             if 'ns_on' in ts.iterkeys():
-                vis1 = vis.copy()
-                on = np.where(ts['ns_on'][:])[0]
+                ns_on = ts['ns_on'][:]
+                on = np.flatnonzero(ns_on)
                 if not interpolate_ns:
-                    vis1[on] = complex(np.nan, np.nan)
+                    # mask the ns-on points and the invalid values instead of filling a copy of vis with NaN
+                    mask = ~np.isfinite(vis)
+                    mask[on] = True
+                    vis1 = np.ma.array(vis, mask=mask)
                 else:
-                    off = np.where(np.logical_not(ts['ns_on'][:]))[0]
-                    for fi in xrange(vis1.shape[1]):
-                        itp_real = InterpolatedUnivariateSpline(off, vis1[off, fi].real)
-                        itp_imag= InterpolatedUnivariateSpline(off, vis1[off, fi].imag)
-                        vis1[on, fi] = itp_real(on) + 1.0J * itp_imag(on)
+                    vis1 = vis.copy()
+                    off = np.flatnonzero(np.logical_not(ns_on))
+                    spline_fill(vis1, on, off)
             else:
                 vis1 = vis
         else:
@@ -146,10 +146,8 @@ class Plot(timestream_task.TimestreamTask):
             y_aixs = ts['ra_dec'][:, 0]
             y_label = r'RA / radian'
         elif y_axis == 'time':
-            y_aixs = [ (datetime.utcfromtimestamp(s) + timedelta(hours=8)) for s in (ts['sec1970'][0], ts['sec1970'][-1]) ]
-            y_label = '%s' % y_aixs[0].date()
-            # convert datetime objects to the correct format for matplotlib to work with
-            y_aixs = mdates.date2num(y_aixs)
+            y_aixs = date_util.get_datenum(ts['sec1970'][[0, -1]])
+            y_label = '%s' % mdates.num2date(y_aixs[0]).date()
         else:
             raise ValueError('Invalid y_axis %s, can only be "time", "jul_data" or "ra"' % y_axis)
 
@@ -157,8 +155,6 @@ class Plot(timestream_task.TimestreamTask):
         time_extent = [y_aixs[0], y_aixs[-1]]
         extent = freq_extent + time_extent
 
-        plt.figure()
-
         if gray_color:
             # cmap = 'gray'
             cmap = plt.cm.gray
@@ -175,15 +171,16 @@ class Plot(timestream_task.TimestreamTask):
 
             fig, ax = plt.subplots()
             vis_abs = np.abs(vis1)
+            # equalized images already span the 0-255 levels, so give the
+            # range explicitly instead of letting imshow scan for it
+            vmin, vmax = (0, 255) if hist_equal else (None, None)
             if hist_equal:
-                if isinstance(vis_abs, np.ma.MaskedArray):
-                    vis_hist = hist_eq.hist_eq(vis_abs.filled(0))
-                    vis_abs = np.ma.array(vis_hist, mask=np.ma.getmask(vis_abs))
-                else:
-                    vis_hist = hist_eq.hist_eq(np.where(np.isfinite(vis_abs), vis_abs, 0))
-                    mask = np.where(np.isfinite(vis_abs), False, True)
-                    vis_abs = np.ma.array(vis_hist, mask=mask)
-            im = ax.imshow(vis_abs, extent=extent, origin='lower', aspect='auto', cmap=cmap)
+                # equalize with the masked and invalid values set to 0, and keep them masked
+                vis_data = np.ma.getdata(vis_abs)
+                mask = np.ma.getmaskarray(vis_abs) | ~np.isfinite(vis_data)
+                vis_hist = hist_eq.hist_eq(np.where(mask, 0, vis_data))
+                vis_abs = np.ma.array(vis_hist, mask=mask)
+            im = ax.imshow(vis_abs, extent=extent, origin='lower', aspect='auto', cmap=cmap, vmin=vmin, vmax=vmax)
             # convert axis to datetime string
             if transpose:
                 ax.xaxis_date()
@@ -241,5 +238,5 @@ class Plot(timestream_task.TimestreamTask):
             fig_name = output_path(fig_name, iteration=iteration)
         else:
             fig_name = output_path(fig_name)
-        plt.savefig(fig_name)
-        plt.close()
+        self._fig_writer.savefig(fig, fig_name)
+        plt.close(fig)
@@ -44,4 +44,5 @@ class Combine(timestream_task.TimestreamTask):
     def combine(self, vis, vis_mask, li, gi, tf, ts, **kwargs):
         """Function that does the combine operation."""
 
-        vis_mask[:] = np.sum(vis_mask, axis=2).astype(bool)[:, :, np.newaxis]
+        # reduce the bool masks directly rather than summing them into integers
+        vis_mask[:] = np.any(vis_mask, axis=2)[:, :, np.newaxis]
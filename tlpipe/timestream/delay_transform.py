@@ -8,19 +8,24 @@ Inheritance diagram
 
 """
 
-from datetime import datetime, timedelta
 import numpy as np
-from scipy.interpolate import InterpolatedUnivariateSpline
 import timestream_task
 from tlpipe.container.raw_timestream import RawTimestream
 from tlpipe.container.timestream import Timestream
 from tlpipe.utils.path_util import output_path
+from tlpipe.utils import date_util
+from tlpipe.utils.bl_util import bl_selector
+from tlpipe.utils.fig_writer import FigWriter
+from tlpipe.utils.np_util import spline_fill
 import tlpipe.plot
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 from matplotlib.ticker import MaxNLocator, AutoMinorLocator
 
 
+_cnan = complex(np.nan, np.nan) # complex nan
+
+
 class Delay(timestream_task.TimestreamTask):
     """Delay transform.
 
@@ -64,15 +69,16 @@ class Delay(timestream_task.TimestreamTask):
         show_progress = self.params['show_progress']
         progress_step = self.params['progress_step']
 
-        func(self.transform, full_data=True, show_progress=show_progress, progress_step=progress_step, keep_dist_axis=False)
+        self._bl_selected = bl_selector(self.params['bl_incl'], self.params['bl_excl'])
+
+        with FigWriter() as self._fig_writer:
+            func(self.transform, full_data=True, show_progress=show_progress, progress_step=progress_step, keep_dist_axis=False)
 
         return super(Delay, self).process(ts)
 
     def transform(self, vis, vis_mask, li, gi, bl, ts, **kwargs):
         """Function that does the delay transform."""
 
-        bl_incl = self.params['bl_incl']
-        bl_excl = self.params['bl_excl']
         plot_delay = self.params['plot_delay']
         tau_span = self.params['tau_span']
         fig_prefix = self.params['fig_name']
@@ -107,12 +113,8 @@ class Delay(timestream_task.TimestreamTask):
         else:
             raise ValueError('Need either a RawTimestream or Timestream')
 
-        if bl_incl != 'all':
-            bl1 = set(bl)
-            bl_incl = [ {f1, f2} for (f1, f2) in bl_incl ]
-            bl_excl = [ {f1, f2} for (f1, f2) in bl_excl ]
-            if (not bl1 in bl_incl) or (bl1 in bl_excl):
-                return
+        if not self._bl_selected(bl):
+            return
 
         time = ts.time[:]
         # nt = len(time)
@@ -128,15 +130,12 @@ class Delay(timestream_task.TimestreamTask):
         if flag_mask:
             v_tau = np.ma.array(v_tau, mask=vis_mask)
         elif flag_ns:
-            on = np.where(ts['ns_on'][:])[0]
+            on = np.flatnonzero(ts['ns_on'][:])
             if not interpolate_ns:
-                v_tau[on] = complex(np.nan, np.nan)
+                v_tau[on] = _cnan
             else:
-                off = np.where(np.logical_not(ts['ns_on'][:]))[0]
-                for fi in xrange(nfreq):
-                    itp_real = InterpolatedUnivariateSpline(off, v_tau[off, fi].real)
-                    itp_imag= InterpolatedUnivariateSpline(off, v_tau[off, fi].imag)
-                    v_tau[on, fi] = itp_real(on) + 1.0J * itp_imag(on)
+                off = np.flatnonzero(np.logical_not(ts['ns_on'][:]))
+                spline_fill(v_tau, on, off)
 
         # plot
         if plot_delay:
@@ -161,10 +160,8 @@ class Delay(timestream_task.TimestreamTask):
                 y_aixs = ts['ra_dec'][:, 0]
                 y_label = r'RA / radian'
             elif y_axis == 'time':
-                y_aixs = [ (datetime.utcfromtimestamp(s) + timedelta(hours=8)) for s in (ts['sec1970'][0], ts['sec1970'][-1]) ]
-                y_label = '%s' % y_aixs[0].date()
-                # convert datetime objects to the correct format for matplotlib to work with
-                y_aixs = mdates.date2num(y_aixs)
+                y_aixs = date_util.get_datenum(ts['sec1970'][[0, -1]])
+                y_label = '%s' % mdates.num2date(y_aixs[0]).date()
             else:
                 raise ValueError('Invalid y_axis %s, can only be "time", "jul_data" or "ra"' % y_axis)
 
@@ -172,8 +169,6 @@ class Delay(timestream_task.TimestreamTask):
             time_extent = [y_aixs[0], y_aixs[-1]]
             extent = tau_extent + time_extent
 
-            plt.figure()
-
             if gray_color:
                 # cmap = 'gray'
                 cmap = plt.cm.gray
@@ -247,5 +242,5 @@ class Delay(timestream_task.TimestreamTask):
                 fig_name = output_path(fig_name, iteration=self.iteration)
             else:
                 fig_name = output_path(fig_name)
-            plt.savefig(fig_name)
-            plt.close()
+            self._fig_writer.savefig(fig, fig_name)
+            plt.close(fig)
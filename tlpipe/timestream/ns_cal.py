@@ -9,7 +9,6 @@ Inheritance diagram
 """
 
 import os
-from datetime import datetime, timedelta
 import numpy as np
 from scipy.interpolate import InterpolatedUnivariateSpline
 import h5py
@@ -18,6 +17,7 @@ from caput import mpiarray
 import timestream_task
 from tlpipe.container.raw_timestream import RawTimestream
 from tlpipe.utils.path_util import output_path
+from tlpipe.utils import date_util
 import tlpipe.plot
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
@@ -337,14 +337,12 @@ class NsCal(timestream_task.TimestreamTask):
                 vis[i1:i2] = vis[i1:i2] / this_itp_amp
 
         if plot_gain and (bl in bls_plt and fi in freq_plt):
-            plt.figure()
             if phs_only:
                 fig, ax = plt.subplots()
             else:
                 fig, ax = plt.subplots(2, sharex=True)
-            ax_val = np.array([ (datetime.utcfromtimestamp(sec) + timedelta(hours=8)) for sec in rt['sec1970'][:] ])
-            xlabel = '%s' % ax_val[0].date()
-            ax_val = mdates.date2num(ax_val)
+            ax_val = date_util.get_datenum(rt['sec1970'][:])
+            xlabel = '%s' % mdates.num2date(ax_val[0]).date()
             if order_bl and (bl[0] > bl[1]):
                 # negate phase as for the conj of vis
                 all_phase = np.where(np.isfinite(all_phase), -all_phase, np.nan)
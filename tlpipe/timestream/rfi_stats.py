@@ -8,10 +8,10 @@ Inheritance diagram
 
 """
 
-from datetime import datetime, timedelta
 import numpy as np
 import timestream_task
 from tlpipe.utils.path_util import output_path
+from tlpipe.utils import date_util
 import tlpipe.plot
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
@@ -70,15 +70,19 @@ class Stats(timestream_task.TimestreamTask):
         if 'ns_on' in ts.iterkeys():
             vis_mask[ts['ns_on'][:]] = False
 
+        # collapse the baseline axis once, then reduce the much smaller
+        # (time, freq) counts for both statistics
+        tf_mask = np.sum(vis_mask, axis=2)
+
         # statistics along time axis
-        time_mask = np.sum(vis_mask, axis=(1, 2)).reshape(-1, 1)
+        time_mask = np.sum(tf_mask, axis=1).reshape(-1, 1)
         # gather local array to rank0
         time_mask = mpiutil.gather_array(time_mask, axis=1, root=0, comm=ts.comm)
         if mpiutil.rank0:
             time_mask = np.sum(time_mask, axis=1)
 
         # statistics along time axis
-        freq_mask = np.sum(vis_mask, axis=(0, 2)).reshape(-1, 1)
+        freq_mask = np.sum(tf_mask, axis=0).reshape(-1, 1)
         # gather local array to rank0
         freq_mask = mpiutil.gather_array(freq_mask, axis=1, root=0, comm=ts.comm)
         if mpiutil.rank0:
@@ -92,11 +96,9 @@ class Stats(timestream_task.TimestreamTask):
                 time_fig_name = output_path(time_fig_name)
 
             # plot time_mask
-            plt.figure()
             fig, ax = plt.subplots()
-            x_vals = np.array([ (datetime.utcfromtimestamp(s) + timedelta(hours=8)) for s in ts['sec1970'][:] ])
-            xlabel = '%s' % x_vals[0].date()
-            x_vals = mdates.date2num(x_vals)
+            x_vals = date_util.get_datenum(ts['sec1970'][:])
+            xlabel = '%s' % mdates.num2date(x_vals[0]).date()
             ax.plot(x_vals, 100*time_mask/np.float(nf*nb))
             ax.xaxis_date()
             date_format = mdates.DateFormatter('%H:%M')
@@ -0,0 +1,34 @@
+"""Baseline utils."""
+
+
+def bl_selector(bl_incl='all', bl_excl=[]):
+    """Return a function that tells whether a baseline is selected.
+
+    Parameters
+    ----------
+    bl_incl : 'all' or list of (feed1, feed2) pairs, optional
+        Baselines to include, in either feed order. If 'all', all baselines
+        are selected and `bl_excl` is not used. Default is 'all'.
+    bl_excl : list of (feed1, feed2) pairs, optional
+        Baselines to exclude from `bl_incl`, in either feed order. Default
+        is an empty list.
+
+    Returns
+    -------
+    selected : function
+        ``selected(bl)`` returns True if the baseline `bl`, a (feed1, feed2)
+        pair, is selected.
+
+    """
+    if bl_incl == 'all':
+        return lambda bl: True
+
+    # sets of sets make the lookup hash based and independent of the feed order
+    incl = frozenset(frozenset(bl) for bl in bl_incl)
+    excl = frozenset(frozenset(bl) for bl in bl_excl)
+
+    def selected(bl):
+        bl = frozenset(bl)
+        return (bl in incl) and not (bl in excl)
+
+    return selected
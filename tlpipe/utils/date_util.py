@@ -1,9 +1,17 @@
 """Date and time utils."""
 
 import re
+from datetime import datetime, timedelta
+import numpy as np
 import ephem
 
 
+def _tzone_hours(tzone):
+    # Return the offset in hours of time zone `tzone` in format 'UTC[+/-]xxh'.
+    pattern = '[-+]?\d+'
+    return int(re.search(pattern, tzone).group())
+
+
 def get_ephdate(local_time, tzone='UTC+08h'):
     """Convert `local_time` to ephem utc date.
 
@@ -25,10 +33,7 @@ def get_ephdate(local_time, tzone='UTC+08h'):
     `get_juldate`
     """
     local_time = ephem.Date(local_time)
-    pattern = '[-+]?\d+'
-    tz = re.search(pattern, tzone).group()
-    tz = int(tz)
-    utc_time = local_time - tz * ephem.hour
+    utc_time = local_time - _tzone_hours(tzone) * ephem.hour
 
     return utc_time
 
@@ -55,3 +60,28 @@ def get_juldate(local_time, tzone='UTC+08h'):
     """
 
     return ephem.julian_date(get_ephdate(local_time, tzone))
+
+
+def get_datenum(sec1970, tzone='UTC+08h'):
+    """Convert seconds since the Unix epoch to matplotlib dates in local time.
+
+    Parameters
+    ----------
+    sec1970 : float or array like
+        Seconds since 1970-01-01 00:00:00 UTC.
+    tzone : string, optional
+        Time zone in format 'UTC[+/-]xxh'. Defaut: UTC+08h.
+
+    Returns
+    -------
+    datenum : float or np.ndarray
+        The matplotlib date numbers of the local times.
+
+    """
+    # imported here to keep matplotlib out of the import of this module
+    import matplotlib.dates as mdates
+
+    # offset the date number of the epoch instead of converting each time point
+    epoch = mdates.date2num(datetime.utcfromtimestamp(0) + timedelta(hours=_tzone_hours(tzone)))
+
+    return epoch + np.asarray(sec1970) / 86400.0
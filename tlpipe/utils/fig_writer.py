@@ -0,0 +1,76 @@
+"""Write matplotlib figures to disk in background threads."""
+
+import os
+from io import BytesIO
+from multiprocessing.pool import ThreadPool
+
+
+def _write(fname, data):
+    with open(fname, 'wb') as f:
+        f.write(data)
+
+
+class FigWriter(object):
+    """Save matplotlib figures with the file writing done in background threads.
+
+    The figures are rendered on the calling thread, as matplotlib is not
+    thread-safe, and only the rendered image data is written to disk by the
+    worker threads, so the caller can go on with the next figure while the
+    previous one is still being written.
+
+    It can be used as a context manager, which closes the writer on exit::
+
+        with FigWriter() as writer:
+            writer.savefig(fig, 'fig.png')
+
+    Parameters
+    ----------
+    nthreads : integer, optional
+        Number of writer threads. Default is 1.
+
+    """
+
+    def __init__(self, nthreads=1):
+        self._pool = ThreadPool(nthreads)
+        self._results = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def savefig(self, fig, fname, **kwargs):
+        """Render `fig` and write it to file `fname` in the background.
+
+        The image format is inferred from the extension of `fname` unless it
+        is given as the `format` keyword. All keywords are passed to
+        :meth:`matplotlib.figure.Figure.savefig`. Errors of the earlier writes
+        that have finished by now are re-raised here.
+
+        """
+        if kwargs.get('format') is None:
+            kwargs['format'] = os.path.splitext(fname)[1][1:] or None
+        buf = BytesIO()
+        fig.savefig(buf, **kwargs)
+
+        # queue this write and drop the earlier ones that have finished
+        pending, done = [], []
+        for res in self._results:
+            (done if res.ready() else pending).append(res)
+        pending.append(self._pool.apply_async(_write, (fname, buf.getvalue())))
+        self._results = pending
+        for res in done:
+            res.get() # re-raise any error of the finished write
+
+    def close(self):
+        """Wait for all pending writes to finish and stop the writer threads.
+
+        Any error raised while writing a file is re-raised here.
+
+        """
+        self._pool.close()
+        self._pool.join()
+        results, self._results = self._results, []
+        for res in results:
+            res.get()
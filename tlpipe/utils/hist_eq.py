@@ -9,15 +9,16 @@ def hist_eq(img):
     https://en.wikipedia.org/wiki/Histogram_equalization
     """
 
-    if not (img.min() >= 0 and img.max() <= 256):
-        img = np.around(256.0 * img / (img.max() - img.min())).astype('uint8')
+    img_min, img_max = img.min(), img.max()
+    if not (img_min >= 0 and img_max <= 256):
+        img = np.around(256.0 * img / (img_max - img_min)).astype('uint8')
     else:
         img = np.around(img).astype('uint8')
 
-    hist, bins = np.histogram(img.flatten(), 256, [0,256])
+    # the uint8 values index their own bins, so count them directly
+    hist = np.bincount(img.ravel(), minlength=256)
 
     cdf = hist.cumsum()
-    cdf_normalized = cdf * hist.max() / cdf.max()
     cdf_m = np.ma.masked_equal(cdf, 0)
     cdf_m = (cdf_m - cdf_m.min()) * 255 / (cdf_m.max() - cdf_m.min())
     cdf = np.ma.filled(cdf_m, 0).astype('uint8')
@@ -82,13 +82,18 @@ def multiscale_median_transform(a, level=None, scale=2, approx_only=False):
         return [ a ]
 
     W = []
+    buf = None
 
     for li in xrange(level):
         if li > 0:
             scale *= 2
-        approx = median_filter(a, 2*scale+1)
+        approx = median_filter(a, 2*scale+1, output=buf)
         if not approx_only:
             W.append(a - approx)
+        elif li > 0:
+            # the previous approximation is no longer needed, reuse it as the
+            # output of the next level instead of allocating a new array
+            buf = a
         a = approx
 
     W.append(approx)
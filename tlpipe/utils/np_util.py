@@ -1,4 +1,5 @@
 import numpy as np
+from scipy.interpolate import CubicSpline
 
 
 def unique(ar, return_index=False, return_inverse=False, return_counts=False):
@@ -267,4 +268,60 @@ def average(a, axis=None, weights=None, returned=False):
     if returned:
         return result, d
     else:
-        return result
\ No newline at end of file
+        return result
+
+
+def masked_if_any(a, mask):
+    """Return `a` as a masked array with `mask`, or `a` itself if nothing is masked.
+
+    Operations on masked arrays are much slower than on plain arrays, so the
+    masked array is only made when `mask` has any True element.
+
+    Parameters
+    ----------
+    a : np.ndarray
+        Input data.
+    mask : array_like of bool
+        Mask of `a`, True for the masked elements.
+
+    Returns
+    -------
+    out : np.ndarray or np.ma.MaskedArray
+        `a` itself or the masked array of `a`.
+
+    """
+    if np.any(mask):
+        return np.ma.array(a, mask=mask)
+    else:
+        return a
+
+
+def spline_fill(a, on, off):
+    """Fill rows `on` of `a` in place by spline interpolation of rows `off`.
+
+    Each column of the 2-D array `a` is interpolated along its first axis with
+    a cubic spline through the rows `off`, all the columns being fitted in a
+    single call. The real and imaginary parts of a complex `a` are interpolated
+    separately. A column (or part) with non-finite values in rows `off` can
+    not be fitted, and its rows `on` are filled with NaN.
+
+    Parameters
+    ----------
+    a : 2-D np.ndarray
+        The data to fill.
+    on : array like of int
+        Indices of the rows to fill, in increasing order.
+    off : array like of int
+        Indices of the rows to interpolate from, in increasing order.
+
+    """
+    parts = (a.real, a.imag) if np.iscomplexobj(a) else (a,)
+    for part in parts:
+        part_off = part[off]
+        finite = np.isfinite(part_off).all(axis=0)
+        good = np.flatnonzero(finite)
+        bad = np.flatnonzero(~finite)
+        if len(good) > 0:
+            part[np.ix_(on, good)] = CubicSpline(off, part_off[:, good], axis=0)(on)
+        if len(bad) > 0:
+            part[np.ix_(on, bad)] = np.nan
@@ -2,6 +2,10 @@ import numpy as np
 from math import factorial
 
 
+# cache of the filter coefficients, keyed by (window_size, order, deriv, rate)
+_coeffs = {}
+
+
 def savitzky_golay(y, window_size, order, deriv=0, rate=1):
     r"""Smooth (and optionally differentiate) data with a Savitzky-Golay filter.
 
@@ -70,11 +74,13 @@ def savitzky_golay(y, window_size, order, deriv=0, rate=1):
     if window_size < order + 2:
         raise TypeError("window_size is too small for the polynomials order")
 
-    order_range = xrange(order+1)
     half_window = (window_size -1) // 2
-    # pre-compute coefficients
-    b = np.mat([[k**i for i in order_range] for k in xrange(-half_window, half_window+1)])
-    m = np.linalg.pinv(b).A[deriv] * rate**deriv * factorial(deriv)
+    # pre-compute coefficients, they only depend on the filter parameters
+    key = (window_size, order, deriv, rate)
+    if not key in _coeffs:
+        b = np.arange(-half_window, half_window+1, dtype=np.float64)[:, np.newaxis]**np.arange(order+1)
+        _coeffs[key] = np.linalg.pinv(b)[deriv] * rate**deriv * factorial(deriv)
+    m = _coeffs[key]
     # pad the signal at the extremes with
     # values taken from the signal itself
     firstvals = y[0] - np.abs( y[1:half_window+1][::-1] - y[0] )